@@ -1,14 +1,127 @@
+import asyncio
+import functools
+from concurrent.futures import ProcessPoolExecutor
 import sqlite3
+import aiohttp
 import requests
+import soupsieve
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
 import os
 import json
-from pprint import pprint
+from dataclasses import dataclass
+from pathlib import Path
 from bs4 import BeautifulSoup
 
+# (connect, read) timeout in seconds for every HTTP request
+REQUEST_TIMEOUT = (5, 30)
+IMAGE_CHUNK_SIZE = 64 * 1024
+NON_DIGIT_RE = re.compile(r'\D')
+# Optional amount, optional unit of at most 4 characters (only after an amount) and the ingredient
+# Amounts may use vulgar fractions such as '1½' or '½' (U+00BC-U+00BE and U+2150-U+215E)
+INGREDIENT_RE = re.compile(
+    r'^\s*(?:([\d¼-¾⅐-⅞]+(?:[.,/]\d+)?)\s+(?:(\S{1,4})\s+)?)?(\S.*?)\s*$')
+# Removes the control characters that break json.loads on embedded ld+json
+JSON_STRIP = str.maketrans('', '', '\n\r\t')
+# Values of recipe_preparation_type in the config file
+PREP_KINDS = ('ld_json', 'list')
+# Config keys of the selectors used by the parse_* methods, mapped to their SiteConfig field
+PARSE_SELECTORS = {
+    "recipe_name": "name_sel",
+    "recipe_persons": "persons_sel",
+    "recipe_time": "time_sel",
+    "recipe_ingredients": "ing_sel",
+    "recipe_prepration": "prep_sel",
+}
+
+
+def create_session():
+    """
+    Create a requests Session with a pooled, retrying adapter mounted for http and https.
+    Sharing one session keeps connections to the same host alive between recipes.
+
+    Returns:
+    - requests.Session: The configured session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16,
+                          max_retries=Retry(total=3, backoff_factor=0.3))
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def decode_html(content, charset):
+    """
+    Decode a fetched page with the charset declared in the Content-Type header.
+    Without a declared charset the raw bytes are returned, so the lxml parser can read
+    the <meta> charset of the page instead of running a charset detection on the text.
+
+    Parameters:
+    - content (bytes): The body of the response.
+    - charset (str): The declared charset, or None.
+
+    Returns:
+    - str or bytes: The decoded HTML, or the raw bytes.
+    """
+    if charset:
+        try:
+            return content.decode(charset, errors='replace')
+        except LookupError:
+            pass  # Unknown charset, let the parser sniff it
+    return content
+
+
+@dataclass(frozen=True)
+class SiteConfig:
+    """
+    Resolved configuration of one recipe website with compiled selectors.
+    Image settings missing from the config file are None.
+    """
+    name_sel: soupsieve.SoupSieve = None
+    persons_sel: soupsieve.SoupSieve = None
+    time_sel: soupsieve.SoupSieve = None
+    ing_sel: soupsieve.SoupSieve = None
+    prep_sel: soupsieve.SoupSieve = None
+    prep_kind: str = 'list'  # 'ld_json' or 'list'
+    image_folder: str = None
+    image_container_sel: soupsieve.SoupSieve = None
+    image_tag_sel: soupsieve.SoupSieve = None
+    image_name_attribute: str = None
+
+    def parse_selectors(self):
+        """
+        Get the selectors used by the parse_* methods.
+
+        Returns:
+        - dict: The config keys mapped to their compiled selector.
+        """
+        return {key: getattr(self, field) for key, field in PARSE_SELECTORS.items()}
+
+
+@dataclass(frozen=True)
+class ParsedRecipe:
+    """
+    Result of parsing a recipe page, small enough to send back from a worker process.
+    """
+    recipe_name: str = None
+    number_of_persons: str = None
+    time_duration: str = None
+    ingredients_source: tuple = ()
+    preparation_steps: tuple = ()
+    image: tuple = None
+
 
 class RecipeParser:
-    def __init__(self, url, config_loader, recipe_source):
+    _session = create_session()
+    # One parser is created per URL, slots keep the instances small in large batches
+    __slots__ = ('recipe_source', 'config_loader', 'site', 'configurations', 'recipe_id', 'recipe_name',
+                 'recipe_description', '_number_of_persons', 'time_duration', 'source_url', 'etag',
+                 'last_modified', 'ingredients_source', 'preparation_steps', '_html_content', '_soup',
+                 '_elements', 'image_path')
+
+    def __init__(self, url, config_loader, recipe_source, html_content=None, site=None):
         """
         RecipeParser() is used to get the data of the recipe from an URL.
         Provide the URL and the config_loader to get the data.
@@ -18,36 +131,61 @@ class RecipeParser:
         Parameters:
         - url (str): The URL of the recipe page.
         - config_loader (ConfigLoader): An instance of ConfigLoader for loading configuration data.
+        - recipe_source (str): The name of the website where the recipe is located.
+        - html_content (str or bytes): Already fetched HTML of the page. If None, the page is fetched from the URL
+                              the first time it is needed.
+        - site (SiteConfig): Already resolved config of the website. If None, it is looked up
+                             with the config_loader.
         """
-        self.recipe_source = "".join(recipe_source.lower().split())
+        self.recipe_source = self.source_key(recipe_source)
         self.config_loader = config_loader
+        self.site = site if site is not None else config_loader.get_site_config(self.recipe_source)
         self.recipe_id = None
         self.recipe_name = None
         self.recipe_description = None
         self._number_of_persons = None
         self.time_duration = None
         self.source_url = url
+        # HTTP cache validators of the page, set by the batch driver (process_recipe) which is
+        # the only path that fetches conditionally
+        self.etag = None
+        self.last_modified = None
         self.ingredients_source = []
         self.preparation_steps = []
-        self.html_content = self.get_html_content()
-        self.soup = BeautifulSoup(self.html_content, 'html.parser')
-        self._configurations = {}
+        self._html_content = html_content
+        self._soup = None
+        # Raw config of the recipe source as found in the config file
+        self.configurations = config_loader.config_data.get(self.recipe_source, {}) if config_loader else {}
+        self._elements = None
         self.image_path = ""
     
     def __str__(self):
         return f"{self.recipe_name} from {self.recipe_source}"
 
-    @property
-    def configurations(self):
+    @staticmethod
+    def source_key(recipe_source):
         """
-        Get the configurations for parsing recipe information, ingredients and preparation steps.
+        Normalize a website name to its key in the config file, e.g. 'Dagelijkse Kost' -> 'dagelijksekost'.
         """
-        self.configurations = self.config_loader.get_configurations()
+        return "".join(recipe_source.lower().split())
 
-    @configurations.setter
-    def configurations(self):
+    @property
+    def html_content(self):
+        """
+        Get the HTML content of the recipe page, fetching it on first access.
+        """
+        if self._html_content is None:
+            self._html_content = self.get_html_content()
+        return self._html_content
 
-        self._configurations = {}
+    @property
+    def soup(self):
+        """
+        Get the parsed HTML of the recipe page, parsing it on first access.
+        """
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.html_content, 'lxml')
+        return self._soup
 
     @property
     def number_of_persons(self):
@@ -62,7 +200,7 @@ class RecipeParser:
         Set the number of persons for the recipe.
         """
         if persons:
-            persons = re.sub(r'\D', '', persons)  # Extract only digits
+            persons = NON_DIGIT_RE.sub('', persons)  # Extract only digits
         self._number_of_persons = persons
 
     def get_html_content(self):
@@ -70,17 +208,52 @@ class RecipeParser:
         Fetch HTML content from the provided URL.
 
         Returns:
-        - str: The HTML content.
+        - str or bytes: The HTML content, see decode_html().
         Raises:
         - Exception: If fetching HTML content fails.
         """
-        response = requests.get(self.source_url)
+        response = self._session.get(self.source_url, timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
-            return response.text
+            # requests guesses ISO-8859-1 for text/* without a charset, only trust a declared one
+            declared = 'charset' in response.headers.get('Content-Type', '').lower()
+            return decode_html(response.content, response.encoding if declared else None)
         else:
             raise Exception(
                 f"Failed to fetch HTML content. Status code: {response.status_code}")
 
+    @staticmethod
+    async def fetch_html(session, url, headers=None):
+        """
+        Fetch HTML content from the provided URL without blocking the event loop.
+
+        Parameters:
+        - session (aiohttp.ClientSession): The session used for the request.
+        - url (str): The URL of the recipe page.
+        - headers (dict): Extra request headers, e.g. the conditional headers from RecipeStore.
+        Returns:
+        - tuple: The HTML content (see decode_html()) and the response headers,
+                 or None if the page was not modified.
+        Raises:
+        - Exception: If fetching HTML content fails.
+        """
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return None
+            if response.status == 200:
+                return decode_html(await response.read(), response.charset), response.headers
+            raise Exception(
+                f"Failed to fetch HTML content. Status code: {response.status}")
+
+    def set_validators(self, headers):
+        """
+        Keep the ETag and Last-Modified response headers to store with the recipe.
+
+        Parameters:
+        - headers (Mapping): The response headers of the recipe page.
+        """
+        self.etag = headers.get('ETag')
+        self.last_modified = headers.get('Last-Modified')
+
     def get_recipe_info(self):
         """
         Get a dictionary containing various recipe information.
@@ -100,210 +273,259 @@ class RecipeParser:
         }
         return info_dict
 
-    def data_to_database(self):
+    def data_to_database(self, store=None):
         """
-        Create SQLite database tables and insert parsed data into the tables.
+        Insert parsed data into the database tables.
+
+        Parameters:
+        - store (RecipeStore): The open database to write to. If None, a store is opened
+                               for this call only.
+        Raises:
+        - Exception: If no recipe name was parsed, nothing is written then.
         """
-        conn = sqlite3.connect('recipe_database.db')
-        cursor = conn.cursor()
+        if self.recipe_name is None:
+            raise Exception(
+                f"No recipe name found on {self.source_url}, not saved. Check the '{self.recipe_source}' configuration.")
+
+        own_store = store is None
+        if own_store:
+            store = RecipeStore()
 
         try:
-            self.recipe_info_to_table(cursor)
-            self.ingredients_to_table(cursor)
-            self.prep_steps_to_table(cursor)
-            print(f'{self.recipe_name} from {self.recipe_source} saved to database.')
-
-        except sqlite3.IntegrityError as e:
-            # Catch the 'UNIQUE constraint failed' error
-            print(f"SQLite Error: {e}")
-            print("Failed to insert record due to duplicate name.")
-
-        conn.commit()
-        conn.close()
-
-    def recipe_info_to_table(self, cursor):
-        """
-        Create the RecipeInfo table.
-        """
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS RecipeInfo (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT UNIQUE,
-                description TEXT,
-                number_of_persons TEXT,
-                time_duration TEXT,
-                source_url TEXT
-            )
-        ''')
-        cursor.execute('INSERT INTO RecipeInfo (name, description, number_of_persons, time_duration, source_url) VALUES (?, ?, ?, ?, ?)',
-                       (self.recipe_name, self.recipe_description, self.number_of_persons, self.time_duration, self.source_url))
-        self.recipe_id = cursor.lastrowid
-
-    def ingredients_to_table(self, cursor):
-        """
-        Create the Ingredients table.
-        """
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Ingredients (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ingredient TEXT,
-                amount TEXT,
-                unit TEXT,
-                ingredient_source TEXT,
-                recipe_id INTEGER,
-                FOREIGN KEY (recipe_id) REFERENCES RecipeInfo (id)
-            )
-        ''')
-        for raw_ingredient in self.ingredients_source:
-            self.insert_ingredient(cursor, raw_ingredient)
-
-    def insert_ingredient(self, cursor, raw_ingredient):
-        """
-        Insert an ingredient into the Ingredients table.
+            # One transaction for all tables, committed on success and rolled back on error
+            with store.conn:
+                inserted = self.recipe_info_to_table(store)
+                if inserted:
+                    self.ingredients_to_table(store)
+                    self.prep_steps_to_table(store)
+            if inserted:
+                print(f'{self.recipe_name} from {self.recipe_source} saved to database.')
+            else:
+                print(f"{self.recipe_name} is already in the database with id {self.recipe_id}, not saved again.")
+
+        finally:
+            if own_store:
+                store.close()
+
+    def recipe_info_to_table(self, store):
+        """
+        Insert the recipe information into the RecipeInfo table.
+        A recipe with the same name is left as it is and its id is used instead.
+
+        Returns:
+        - bool: True if the recipe was inserted, False if it already existed.
+        """
+        row = store.conn.execute(
+            store.ins_info,
+            (self.recipe_name, self.recipe_description, self.number_of_persons, self.time_duration, self.source_url,
+             self.etag, self.last_modified)).fetchone()
+        if row is not None:
+            self.recipe_id = row[0]
+            return True
+
+        row = store.conn.execute(store.sel_id_by_name, (self.recipe_name,)).fetchone()
+        self.recipe_id = row[0] if row else None
+        return False
+
+    def validators_to_table(self, store):
+        """
+        Store the cache validators of the recipe page in the RecipeInfo table.
+        Only a row stored from the same URL is updated, so validators of one server are never
+        sent to another. Call this once everything of the recipe is saved, a 304 on the next
+        run skips the whole recipe.
+        """
+        if self.recipe_id is None or not (self.etag or self.last_modified):
+            return
+        with store.conn:
+            store.conn.execute(store.upd_validators,
+                               (self.etag, self.last_modified, self.recipe_id, self.source_url))
+
+    def ingredients_to_table(self, store):
+        """
+        Insert the ingredients into the Ingredients table.
+        """
+        store.conn.executemany(
+            store.ins_ing,
+            (self.ingredient_row(raw_ingredient) for raw_ingredient in self.ingredients_source))
+
+    def ingredient_row(self, raw_ingredient):
+        """
+        Build the row to insert into the Ingredients table for a raw ingredient.
+
+        Returns:
+        - tuple: The ingredient, amount, unit, raw ingredient and recipe id.
         """
         amount, unit, ingredient = self.parse_amount_unit_ingredient(
             raw_ingredient)
         ingredient = ingredient if ingredient is not None else 'Unknown Ingredient'
         amount = amount if amount is not None else 0
         unit = unit if unit is not None else 'Unknown Unit'
-        cursor.execute(
-            'INSERT INTO Ingredients (ingredient, amount, unit, ingredient_source, recipe_id) VALUES (?, ?, ?, ?, ?)', (ingredient, amount, unit, raw_ingredient, self.recipe_id))
+        return ingredient, amount, unit, raw_ingredient, self.recipe_id
 
-    def prep_steps_to_table(self, cursor):
+    def prep_steps_to_table(self, store):
         """
-        Create the Preparation table.
+        Insert the preparation steps into the Preparation table.
         """
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS Preparation (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                step TEXT,
-                recipe_id INTEGER,
-                FOREIGN KEY (recipe_id) REFERENCES RecipeInfo (id)
-            )
-        ''')
-        for step in self.preparation_steps:
-            cursor.execute(
-                'INSERT INTO Preparation (step, recipe_id) VALUES (?, ?)', (step, self.recipe_id))
+        store.conn.executemany(
+            store.ins_prep,
+            ((step, self.recipe_id) for step in self.preparation_steps))
 
-    def save_recipe_image(self):
+    def find_recipe_image(self):
         """
-        Save the recipe image to a specified folder.
+        Find the recipe image in the HTML content using the image configuration.
 
-        Parameters:
-        - config_key (str): The key to identify the configuration for image retrieval in the config file.
-                            Default is 'image_config' assuming it's present in the config file.
+        Returns:
+        - tuple: The image folder, image URL and image name, or None if no image was found.
         """
-        # Get the image configuration from the config file
-        image_config = self.config_loader.get_images_config(self.recipe_source)
-
-        # Extract values from the image configuration
-        image_folder = image_config.get('image_folder')
-        image_container_selector = image_config.get('image_container_selector')
-        image_tag_selector = image_config.get('image_tag_selector')
-        image_name_attribute = image_config.get('image_name_attribute')
+        if self.site.image_container_sel is None or self.site.image_tag_sel is None:
+            print("No image configuration found.")
+            return None
 
         # Find the <div> tag within the specified container using the provided selector
-        image_container_div = self.soup.select_one(image_container_selector)
-
-        if image_container_div:
-            # Find the <img> tag within the image container using the provided selector
-            image_tag = image_container_div.select_one(image_tag_selector)
-
-            if image_tag:
-                # Get the image URL and name using the provided attributes
-                image_url = image_tag['src']
-                image_name = image_tag[image_name_attribute]
-
-                # Ensure the image folder exists, if not, create it
-                if not os.path.exists(image_folder):
-                    os.makedirs(image_folder)
-                else:
-                    # Save the image
-                    image_path = os.path.join(
-                        image_folder, f"{image_name}.jpg")
-                    response = requests.get(image_url)
-
-                with open(image_path, 'wb') as image_file:
-                    image_file.write(response.content)
-                
-                self.image_path = image_path
-            else:
-                print("No image tag found in the image container.")
-        else:
+        image_container_div = self.site.image_container_sel.select_one(self.soup)
+
+        if not image_container_div:
             print("No div tag found for image container.")
+            return None
 
-    def parse_recipe_info(self):
+        # Find the <img> tag within the image container using the provided selector
+        image_tag = self.site.image_tag_sel.select_one(image_container_div)
+
+        if not image_tag:
+            print("No image tag found in the image container.")
+            return None
+
+        # Get the image URL and name using the provided attributes
+        return self.site.image_folder, image_tag['src'], image_tag[self.site.image_name_attribute]
+
+    def save_recipe_image(self, image=None):
         """
-        Parse and extract specific recipe information from the HTML content using soup.select_one.
-        if there is no config found in the config file an exception will be raised.
-        if there is no data found from the html content none will be returned.
+        Save the recipe image to the folder set in the image configuration.
 
         Parameters:
-        - config_key (str): The key to identify the configuration for parsing recipe information.
+        - image (tuple): The image folder, URL and name as returned by find_recipe_image().
+                         If None, the image is looked up in the HTML content.
         """
-        config = self.config_loader.get_recipe_info_config(self.recipe_source)
+        image = image or self.find_recipe_image()
+        if image is None:
+            return
+        image_folder, image_url, image_name = image
 
-        # Extract each piece of information from the config
-        try:
-            name = config.get("recipe_name")
-            if name is None:
-                raise Exception("Missing 'recipe_name' configuration.")
-
-            description = config.get("recipe_description")
-            if description is None:
-                raise Exception("Missing 'recipe_description' configuration.")
-
-            persons = config.get("recipe_persons")
-            if persons is None:
-                raise Exception("Missing 'recipe_persons' configuration.")
-
-            time = config.get("recipe_time")
-            if time is None:
-                raise Exception("Missing 'recipe_time' configuration.")
-        except Exception as e:
-            print("\n############### ERROR in parse_recipe_info() #################")
-            print(e)
-            print("############### ERROR ########################################\n")
-
-        # Extract data from the HTML based on the configurations
-        r_name = self.soup.select_one(name)
-        if r_name:
-            self.recipe_name = r_name.get_text(strip=True)
-        else:
-            self.recipe_name = None
+        # Ensure the image folder exists
+        os.makedirs(image_folder, exist_ok=True)
+        image_path = os.path.join(image_folder, f"{image_name}.jpg")
 
-        r_persons = self.soup.select_one(persons)
-        if r_persons:
-            self.number_of_persons = r_persons.get_text(strip=True)
-        else:
-            self.number_of_persons = None
+        # Stream the image to disk
+        with self._session.get(image_url, stream=True, timeout=REQUEST_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(image_path, 'wb') as image_file:
+                for chunk in response.iter_content(IMAGE_CHUNK_SIZE):
+                    image_file.write(chunk)
 
-        r_time = self.soup.select_one(time)
-        if r_time:
-            self.time_duration = r_time.get_text(strip=True)
-        else:
-            self.time_duration = None
+        self.image_path = image_path
 
-    def parse_ingredients(self):
+    async def fetch_image(self, session, image=None):
         """
-        Parse and extract ingredient information from the HTML content.
+        Download the recipe image to the folder set in the image configuration
+        without blocking the event loop.
 
         Parameters:
-        - config_key (str): The key to identify the configuration for parsing ingredients.
+        - session (aiohttp.ClientSession): The session used for the request.
+        - image (tuple): The image folder, URL and name as returned by find_recipe_image().
+                         If None, the image is looked up in the HTML content.
         """
-        config = self.config_loader.get_ingredients_config(self.recipe_source)
+        image = image or self.find_recipe_image()
+        if image is None:
+            return
+        image_folder, image_url, image_name = image
 
-        # Extract locator from the config file
-        try:
-            ingredients = config.get("recipe_ingredients")
-            if ingredients is None:
-                raise Exception("Missing 'recipe_ingredients' configuration.")
-        except Exception as e:
-            print("\n############### ERROR in parse_ingredients() #################")
-            print(e)
-            print("############### ERROR ########################################\n")
+        os.makedirs(image_folder, exist_ok=True)
+        image_path = os.path.join(image_folder, f"{image_name}.jpg")
+
+        async with session.get(image_url) as response:
+            response.raise_for_status()
+            with open(image_path, 'wb') as image_file:
+                async for chunk in response.content.iter_chunked(IMAGE_CHUNK_SIZE):
+                    image_file.write(chunk)
+
+        self.image_path = image_path
+
+    def to_parsed(self):
+        """
+        Parse the whole recipe page.
+
+        Returns:
+        - ParsedRecipe: The parsed recipe information, ingredients, preparation steps and image.
+        """
+        self.parse_recipe_info()
+        self.parse_ingredients()
+        self.parse_preparation_steps()
+        return ParsedRecipe(
+            recipe_name=self.recipe_name,
+            number_of_persons=self.number_of_persons,
+            time_duration=self.time_duration,
+            ingredients_source=tuple(self.ingredients_source),
+            preparation_steps=tuple(self.preparation_steps),
+            image=self.find_recipe_image(),
+        )
+
+    def load_parsed(self, parsed):
+        """
+        Fill the recipe with the result of parsing its page elsewhere, e.g. in a worker process.
 
-        ingredients_section = self.soup.select_one(ingredients)
+        Parameters:
+        - parsed (ParsedRecipe): The parsed recipe.
+        """
+        self.recipe_name = parsed.recipe_name
+        self.number_of_persons = parsed.number_of_persons
+        self.time_duration = parsed.time_duration
+        self.ingredients_source = list(parsed.ingredients_source)
+        self.preparation_steps = list(parsed.preparation_steps)
+
+    def _extract_all(self, selectors):
+        """
+        Select the first element for every selector in one pass over the config.
+
+        Parameters:
+        - selectors (dict): Config keys mapped to their compiled CSS selectors.
+
+        Returns:
+        - dict: The same keys mapped to the matching element, or None if nothing matched.
+        """
+        return {key: selector.select_one(self.soup) for key, selector in selectors.items()}
+
+    def _parse_elements(self):
+        """
+        Get the elements for all parse selectors of the recipe source, extracting them on first use.
+
+        Returns:
+        - dict: The config keys mapped to the matching element, or None.
+        """
+        if self._elements is None:
+            self._elements = self._extract_all(self.site.parse_selectors())
+        return self._elements
+
+    def parse_recipe_info(self):
+        """
+        Parse and extract specific recipe information from the HTML content.
+        if there is no data found from the html content none will be returned.
+        """
+        elements = self._parse_elements()
+
+        r_name = elements.get("recipe_name")
+        self.recipe_name = r_name.get_text(strip=True) if r_name else None
+
+        r_persons = elements.get("recipe_persons")
+        self.number_of_persons = r_persons.get_text(strip=True) if r_persons else None
+
+        r_time = elements.get("recipe_time")
+        self.time_duration = r_time.get_text(strip=True) if r_time else None
+
+    def parse_ingredients(self):
+        """
+        Parse and extract ingredient information from the HTML content.
+        """
+        ingredients_section = self._parse_elements().get("recipe_ingredients")
 
         if ingredients_section:
             ingredients_list = ingredients_section.find_all('li')
@@ -315,32 +537,20 @@ class RecipeParser:
     def parse_preparation_steps(self):
         """
         Parse and extract preparation steps from the HTML content.
-
-        Parameters:
-        - config_key (str): The key to identify the configuration for parsing preparation steps.
+        The steps are read from an ld+json script tag or from the list items of the section,
+        depending on the preparation type of the website.
         """
-        config = self.config_loader.get_preparation_config(self.recipe_source)
+        preparation_section = self._parse_elements().get("recipe_prepration")
 
-        # Extract locator from the config file
-        try:
-            steps = config.get("recipe_prepration")
-            if steps is None:
-                raise Exception("Missing 'recipe_ingredients' configuration.")
-        except Exception as e:
-            print(
-                "\n############### ERROR in parse_preparation_steps() #################")
-            print(e)
-            print("############### ERROR ########################################\n")
-
-        preparation_section = self.soup.select_one(steps)
-
-        if "script" in steps:
+        if not preparation_section:
+            self.preparation_steps = []
+
+        elif self.site.prep_kind == 'ld_json':
             # Extract the JSON content
-            json_str = preparation_section.string
+            json_str = preparation_section.string or ""
             try:
                 # Clean the JSON string (remove extra whitespace and invalid characters)
-                json_str_cleaned = json_str.strip().replace(
-                    '\n', '').replace('\r', '').replace('\t', '')
+                json_str_cleaned = json_str.strip().translate(JSON_STRIP)
                 # Parse the JSON content
                 data_dict = json.loads(json_str_cleaned)
                 self.preparation_steps = data_dict.get(
@@ -351,12 +561,9 @@ class RecipeParser:
                 return None
 
         else:
-            if preparation_section:
-                preparation_list = preparation_section.find_all('li')
-                self.preparation_steps = [step.get_text(
-                    strip=True) for step in preparation_list]
-            else:
-                self.preparation_steps = []
+            preparation_list = preparation_section.find_all('li')
+            self.preparation_steps = [step.get_text(
+                strip=True) for step in preparation_list]
 
     @staticmethod
     def parse_amount_unit_ingredient(ingredient):
@@ -367,29 +574,12 @@ class RecipeParser:
         Returns:
         - tuple: The amount, unit and ingredient.
         """
-        # Split the ingredient into a list of words
-        ingredient_list = ingredient.split()
-        # Check if the ingredient list is not empty
-        if ingredient_list:
-            # Check if the first word is a number
-            if ingredient_list[0].isnumeric():
-                # Extract the amount and unit
-                amount = ingredient_list[0]
-                if len(ingredient_list[1]) >= 5:
-                    unit = None
-                    ingredient = ' '.join(ingredient_list[1:])
-                else:
-                    unit = ingredient_list[1]
-                    # Extract the ingredient
-                    ingredient = ' '.join(ingredient_list[2:])
-            else:
-                # Extract the ingredient
-                ingredient = ' '.join(ingredient_list)
-                amount = 1
-                unit = None
-        else:
+        match = INGREDIENT_RE.match(ingredient)
+        if not match:
+            return 1, None, None
+        amount, unit, ingredient = match.groups()
+        if amount is None:
             amount = 1
-            unit = None
         return amount, unit, ingredient
 
 
@@ -402,107 +592,324 @@ class ConfigLoader:
     def __init__(self):
         self.config_file = self.find_config_file()
         self.config_data = self.load_config()
+        self._selectors = {}
+        self._site_configs = {}
 
     def find_config_file(self):
-        root_dir = os.path.dirname(os.path.abspath(__file__))
-        for dirpath, dirnames, filenames in os.walk(root_dir):
-            for filename in filenames:
-                if filename == 'config.json':
-                    return os.path.join(dirpath, filename)
-        return None  # File not found
+        """
+        Find config.json next to this module, falling back to a search of its subfolders.
+
+        Returns:
+        - str: The path to the configuration file, or None if it was not found.
+        """
+        root_dir = Path(__file__).resolve().parent
+        config_path = root_dir / 'config.json'
+        if not config_path.exists():
+            config_path = next(root_dir.rglob('config.json'), None)
+        return str(config_path) if config_path else None  # None if file not found
 
     def load_config(self):
         """
         Load configuration data from the specified configuration file.
+        The parsed data is cached until the file is modified.
 
         Returns:
         - dict: The loaded configuration data.
         """
-        with open(self.config_file, 'r') as file:
-            return json.load(file)
+        return self._read_config(self.config_file, os.path.getmtime(self.config_file))
 
-    def get_recipe_info_config(self, source_recipe):
-        """ Retrieves a dict with the locator to get the information of the recipe from the url
-        Args:
-            source_recipe (string): The name of the website where the recipe is located
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def _read_config(config_file, mtime):
+        """
+        Parse the configuration file. The mtime argument is only part of the cache key.
+        """
+        with open(config_file, 'r') as file:
+            return json.load(file)
 
-        Returns:
-            dict: a dict with the information of the recipe
+    def get_selector(self, selector):
         """
+        Get the compiled version of a CSS selector, compiling it on first use.
 
-        data = self.config_data.get(source_recipe, {})
+        Parameters:
+        - selector (str): The CSS selector from the config file.
 
-        # Extract recipe information
-        if data:
-            recipe_info = data.get("recipe_info_config", {})
+        Returns:
+        - soupsieve.SoupSieve: The compiled selector.
+        """
+        compiled = self._selectors.get(selector)
+        if compiled is None:
+            compiled = self._selectors[selector] = soupsieve.compile(selector)
+        return compiled
 
-        return recipe_info
+    def get_site_config(self, source_recipe):
+        """
+        Get the resolved configuration of a website, building and caching it on first use.
 
-    def get_preparation_config(self, source_recipe):
-        """ Retrieves a dict with the locator to get the preparations of the recipe from the url
-        Args:
-            source_recipe (string): The name of the website where the recipe is located
+        Parameters:
+        - source_recipe (str): The name of the website where the recipe is located.
 
         Returns:
-            dict: a dict with the information of the recipe
+        - SiteConfig: The configuration with compiled selectors.
+        Raises:
+        - Exception: If the website is not in the config file, a parse selector is missing
+                     or the preparation type is invalid.
         """
+        site = self._site_configs.get(source_recipe)
+        if site is not None:
+            return site
 
-        data = self.config_data.get(source_recipe, {})
-
-        # Extract preparation steps dict
-        if data:
-            recipe_info = data.get("preparation_config", {})
+        if source_recipe not in self.config_data:
+            raise Exception(
+                f"No configuration found for '{source_recipe}'. Known sites: {', '.join(self.config_data)}")
 
-        return recipe_info
+        parse_config = self.get_parse_config(source_recipe)
+        image_config = self.config_data[source_recipe].get("image_config", {})
 
-    def get_ingredients_config(self, source_recipe):
-        """ Retrieves a dict with the locator to get the ingredients of the recipe from the url
+        missing = [key for key in PARSE_SELECTORS if not parse_config.get(key)]
+        if missing:
+            raise Exception(
+                f"Missing {', '.join(repr(key) for key in missing)} configuration for '{source_recipe}'.")
+
+        prep_selector = parse_config.get("recipe_prepration") or ""
+        prep_kind = parse_config.get("recipe_preparation_type")
+        if prep_kind is None:
+            # Older configs do not set the type, a script selector means ld+json
+            prep_kind = 'ld_json' if "script" in prep_selector else 'list'
+        elif prep_kind not in PREP_KINDS:
+            raise Exception(
+                f"Invalid 'recipe_preparation_type' {prep_kind!r} for '{source_recipe}', "
+                f"expected one of {', '.join(map(repr, PREP_KINDS))}.")
+
+        def compiled(config, key):
+            selector = config.get(key)
+            return self.get_selector(selector) if selector else None
+
+        site = self._site_configs[source_recipe] = SiteConfig(
+            **{field: compiled(parse_config, key) for key, field in PARSE_SELECTORS.items()},
+            prep_kind=prep_kind,
+            image_folder=image_config.get("image_folder"),
+            image_container_sel=compiled(image_config, "image_container_selector"),
+            image_tag_sel=compiled(image_config, "image_tag_selector"),
+            image_name_attribute=image_config.get("image_name_attribute"),
+        )
+        return site
+
+    def get_parse_config(self, source_recipe):
+        """ Retrieves one dict with the recipe info, ingredients and preparation locators of a website
         Args:
             source_recipe (string): The name of the website where the recipe is located
 
         Returns:
-            dict: a dict with the information of the recipe
+            dict: a dict with all locators used to parse the recipe
         """
-
         data = self.config_data.get(source_recipe, {})
+        return {
+            **data.get("recipe_info_config", {}),
+            **data.get("ingredients_config", {}),
+            **data.get("preparation_config", {}),
+        }
 
-        # Extract ingredients dict
-        if data:
-            recipe_info = data.get("ingredients_config", {})
 
-        return recipe_info
+class RecipeStore:
+    """
+    Long-lived connection to the SQLite recipe database.
+    The tables are created once when the store is opened and the insert statements are
+    kept as constants so sqlite3 can reuse its prepared statements across recipes.
 
-    def get_images_config(self, source_recipe):
-        """
-        Get the image configuration for a specific key.
+    Parameters:
+    - database (str): The path to the SQLite database. Default is 'recipe_database.db'.
+    """
+
+    # Duplicate names are skipped without raising, RETURNING needs SQLite 3.35 or newer
+    ins_info = 'INSERT OR IGNORE INTO RecipeInfo (name, description, number_of_persons, time_duration, source_url, etag, last_modified) VALUES (?, ?, ?, ?, ?, ?, ?) RETURNING id'
+    ins_ing = 'INSERT INTO Ingredients (ingredient, amount, unit, ingredient_source, recipe_id) VALUES (?, ?, ?, ?, ?)'
+    ins_prep = 'INSERT INTO Preparation (step, recipe_id) VALUES (?, ?)'
+    sel_id_by_name = 'SELECT id FROM RecipeInfo WHERE name = ?'
+    upd_validators = 'UPDATE RecipeInfo SET etag = ?, last_modified = ? WHERE id = ? AND source_url = ?'
+    sel_validators = 'SELECT etag, last_modified FROM RecipeInfo WHERE source_url = ? ORDER BY id DESC LIMIT 1'
+
+    def __init__(self, database='recipe_database.db'):
+        self.conn = sqlite3.connect(database)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA temp_store=MEMORY')
+        self.create_tables()
+
+    def create_tables(self):
+        """
+        Create the RecipeInfo, Ingredients and Preparation tables if they do not exist.
+        """
+        with self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS RecipeInfo (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT UNIQUE,
+                    description TEXT,
+                    number_of_persons TEXT,
+                    time_duration TEXT,
+                    source_url TEXT,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            ''')
+            # Databases created before the cache validators were stored lack these columns
+            columns = {row[1] for row in self.conn.execute('PRAGMA table_info(RecipeInfo)')}
+            for column in ('etag', 'last_modified'):
+                if column not in columns:
+                    self.conn.execute(f'ALTER TABLE RecipeInfo ADD COLUMN {column} TEXT')
+            # conditional_headers() looks recipes up by URL
+            self.conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_recipeinfo_source_url ON RecipeInfo (source_url)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS Ingredients (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    ingredient TEXT,
+                    amount TEXT,
+                    unit TEXT,
+                    ingredient_source TEXT,
+                    recipe_id INTEGER,
+                    FOREIGN KEY (recipe_id) REFERENCES RecipeInfo (id)
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS Preparation (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    step TEXT,
+                    recipe_id INTEGER,
+                    FOREIGN KEY (recipe_id) REFERENCES RecipeInfo (id)
+                )
+            ''')
+
+    def conditional_headers(self, url):
+        """
+        Build the conditional request headers for a recipe URL that was stored before.
 
         Parameters:
-        - config_key (str): The key to identify the configuration.
+        - url (str): The URL of the recipe page.
 
         Returns:
-        - dict: The preparation configuration.
+        - dict: The If-None-Match and If-Modified-Since headers, empty if nothing is known.
         """
-        data = self.config_data.get(source_recipe, {})
-        if data:
-            folder_config = data.get("image_config", {})
+        row = self.conn.execute(self.sel_validators, (url,)).fetchone()
+        if row is None:
+            return {}
+        etag, last_modified = row
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def close(self):
+        """
+        Close the database connection.
+        """
+        self.conn.close()
 
-        return folder_config
 
+def parse_html(url, html_content, recipe_source, site):
+    """
+    Parse a fetched recipe page. Runs in a worker process of the batch driver,
+    so it only takes and returns picklable values.
 
-if __name__ == "__main__":
+    Parameters:
+    - url (str): The URL of the recipe page.
+    - html_content (str or bytes): The HTML content of the page.
+    - recipe_source (str): The name of the website where the recipe is located.
+    - site (SiteConfig): The resolved config of the website.
+
+    Returns:
+    - ParsedRecipe: The parsed recipe.
+    """
+    recipe = RecipeParser(url=url, config_loader=None, recipe_source=recipe_source,
+                          html_content=html_content, site=site)
+    return recipe.to_parsed()
+
+
+async def process_recipe(url, recipe_site, session, config_loader, store, pool):
+    """
+    Fetch, parse and store a single recipe and download its image.
+    Recipes that were saved before are fetched conditionally and skipped when unchanged.
+    Parsing runs in the process pool, database writes stay on the event loop thread.
+
+    Parameters:
+    - url (str): The URL of the recipe page.
+    - recipe_site (str): The name of the website where the recipe is located.
+    - session (aiohttp.ClientSession): The session shared by all requests.
+    - config_loader (ConfigLoader): An instance of ConfigLoader for loading configuration data.
+    - store (RecipeStore): The open database shared by all recipes.
+    - pool (ProcessPoolExecutor): The pool the HTML is parsed in.
+    """
+    # Resolve the config first so a mistyped site fails without a request
+    site = config_loader.get_site_config(RecipeParser.source_key(recipe_site))
+
+    page = await RecipeParser.fetch_html(session, url, store.conditional_headers(url))
+    if page is None:
+        print(f"{url} has not changed since it was saved, skipped.")
+        return None
+
+    html_content, headers = page
+    recipe = RecipeParser(url=url, config_loader=config_loader,
+                          recipe_source=recipe_site, html_content=html_content, site=site)
+
+    parsed = await asyncio.get_running_loop().run_in_executor(
+        pool, parse_html, url, html_content, recipe.recipe_source, site)
+    recipe.load_parsed(parsed)
+
+    recipe.data_to_database(store)
+    if parsed.image is not None:
+        await recipe.fetch_image(session, parsed.image)
+
+    # Only now a 304 may skip this recipe, a failed image download is retried on the next run
+    recipe.set_validators(headers)
+    recipe.validators_to_table(store)
+    return recipe
 
-    config_loader = ConfigLoader()
 
+def read_recipe_batch():
+    """
+    Ask the user for recipe URLs and site names until an empty URL is entered.
+
+    Returns:
+    - list: A list of (url, recipe_site) tuples.
+    """
+    batch = []
     while True:
-        user_url1 = input("Enter the url of the recipe: ")
+        url = input("Enter the url of the recipe (leave empty to start): ")
+        if not url:
+            return batch
         recipe_site = input("Enter the name of the recipe site: ")
-        recipe = RecipeParser(
-            url=user_url1, config_loader=config_loader, recipe_source=recipe_site)
-        
-        recipe.parse_recipe_info()
-        recipe.parse_ingredients()
-        recipe.parse_preparation_steps()
-        recipe.get_recipe_info()
-
-        recipe.data_to_database()
-        recipe.save_recipe_image()
+        batch.append((url, recipe_site))
+
+
+async def main(config_loader, store):
+    """
+    Read batches of recipes from the user and process each batch concurrently.
+    Stops when an empty batch is entered.
+    """
+    connector = aiohttp.TCPConnector(limit=32, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(connect=REQUEST_TIMEOUT[0], sock_read=REQUEST_TIMEOUT[1])
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as pool:
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            while True:
+                batch = read_recipe_batch()
+                if not batch:
+                    break
+                results = await asyncio.gather(
+                    *(process_recipe(url, site, session, config_loader, store, pool) for url, site in batch),
+                    return_exceptions=True)
+                for (url, _), result in zip(batch, results):
+                    if isinstance(result, Exception):
+                        print(f"Failed to process {url}: {result}")
+
+
+if __name__ == "__main__":
+
+    config_loader = ConfigLoader()
+    store = RecipeStore()
+    try:
+        asyncio.run(main(config_loader, store))
+    finally:
+        store.close()